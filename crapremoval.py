@@ -9,11 +9,64 @@
 # the list of directories, taking up the most space
 # Thus the program can be split to scaner and cleaner
 
+import asyncio
+import bisect
+import heapq
 import json
+import os
+import shutil
+import stat
+import sys
+import time
+from array import array
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from dataclasses import dataclass, field
 from pathlib import Path
-from subprocess import Popen, check_output, CalledProcessError
+from subprocess import Popen
+
+# io_uring allows batching thousands of statx calls so the kernel
+# processes them concurrently while we prepare the next batch.
+# The python bindings are optional - when they are not installed
+# the plain scandir walker is used instead
+try:
+    import liburing
+except ImportError:
+    liburing = None
+
+# inotify lets the kernel tell us about new entries in the watched
+# dirs the moment they appear, so scan can skip re-enumerating and
+# diffing everything. Optional as well - without this module only
+# full rescans are available
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+except ImportError:
+    INotify = None
+
+# the ignore filter tests every candidate path against every ignore
+# substring. With several patterns a precompiled Aho-Corasick automaton
+# finds any of them in a single pass over the path. Optional - with
+# the module missing the plain substring check is used
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# compiled walkers from _walk.pyx keep the whole readdir+lstat loop
+# in C, skipping Python object creation per entry. Optional - build
+# them with "python setup.py build_ext --inplace", without the build
+# the pure python walkers do the same job
+try:
+    import _walk
+except ImportError:
+    _walk = None
+
+# set this env variable to anything non empty to force the plain
+# walker even when liburing is installed
+DISABLE_IO_URING_ENV = 'CRAPREMOVAL_DISABLE_IO_URING'
+# how many statx submissions to queue per io_uring batch
+IO_URING_QUEUE_DEPTH = 16384
 
 # Directory to save script data files
 DATA_FILES_PATH = '~/.cache/crapremoval/'
@@ -104,109 +157,361 @@ class ScannerAndCleaner:
         self.watchdirs_file = data_files_path_Path / 'watchdirs.json'
         # the file to count down the unneeded files removal
         self.timer_file = data_files_path_Path / 'crapremoval_timer'
+        # the file where the inotify daemon records new entries
+        # appearing in the watched dirs
+        self.inotify_journal = data_files_path_Path / 'inotify_journal'
         # directories to keep track of files and dirs in
         self.watch_dirs = [ Path(directory).expanduser() for directory in watch_dirs ]
         # report n top size things
         self.ntopfiles = ntopfiles
         # a list of directories to clean periodically
         self.dirstoclean = dirstoclean
-        # the variable to save current contents of watched dirs
-        # since memory isn't of concern, we save all - set of
-        # path strings, list of strings for json saving and Path
-        # objects for size analyzing instead of turning one
-        # into another back and forth
-        self.watchdirs_content_list = {}
-        self.watchdirs_content_Path = {}
+        # the variable to save current contents of watched dirs as
+        # sets of path strings - the only copy, json saving sorts it
+        # on the fly. Enumerated with os.scandir which returns names
+        # without a stat call per entry, unlike glob which types
+        # every entry it yields
         self.watchdirs_content_set = {}
         for item in self.watch_dirs:
             key = str(item)
-            # set of Path objects
-            self.watchdirs_content_Path[key] = [ x for x in item.glob('*') ]
-            # turn Path objects into their string representations
-            self.watchdirs_content_set[key] = { str(x) for x in self.watchdirs_content_Path[key] }
-            # same as previous but list of strings to save as json
-            self.watchdirs_content_list[key] = list(self.watchdirs_content_set[key])
+            # a watched dir could not exist on this machine, then
+            # just consider it empty
+            try:
+                with os.scandir(item) as it:
+                    names = { entry.path for entry in it }
+            except OSError:
+                names = set()
+            self.watchdirs_content_set[key] = names
         # This string will be gathered during the program run
         # and then may be output on the screen with call to "report" method
         self.notify_report = ''
+        # sizes computed during the scan walk, keyed by absolute path
+        # string. Cleaner reuses them for its pre-clean snapshot instead
+        # of walking the same trees again
+        self._size_cache: dict[str, int] = {}
     
+    @staticmethod
+    def _stat_walk_workers() -> int:
+        """Picks how many threads should walk directory trees in
+        parallel. An ssd handles concurrent walkers well, while on
+        a spinning disk they only fight each other for seeks, so if
+        any rotational block device is present walks go one by one
+
+        Returns:
+            int: worker count for the walk thread pool
+        """
+        try:
+            for rotational in Path('/sys/block').glob('*/queue/rotational'):
+                if rotational.read_text().strip() == '1':
+                    return 1
+        # the sysfs layout isn't guaranteed, e.g. in containers,
+        # then just assume non rotational
+        except OSError:
+            pass
+        # walks are I/O bound so more threads than cores pay off,
+        # but there is no point going beyond several dozens
+        return min(32, (os.cpu_count() or 1) * 4)
+
+    @staticmethod
+    def _dir_size(path: Path) -> int:
+        """Calculates the total size of a directory content in bytes.
+        Walks the tree with os.scandir instead of spawning du, so
+        no fork+exec happens and the stat value, cached on the
+        DirEntry by scandir, gets reused where the OS provides it.
+        Symlinks are not followed, a symlinked root included - it
+        counts as just the link, the same way du reports it.
+
+        Args:
+            path (Path): the directory to measure
+
+        Returns:
+            int: summary size of all files in the tree in bytes
+        """
+        # prefer the compiled walker when it was built
+        if _walk is not None:
+            return _walk.dir_size(str(path))
+        # a symlink or any other non-directory given as the root counts
+        # as itself only - scandir would happily follow it otherwise
+        try:
+            root_stat = os.lstat(path)
+        except OSError:
+            return 0
+        if not stat.S_ISDIR(root_stat.st_mode):
+            return root_stat.st_size
+        total = 0
+        # manual stack instead of recursion, so arbitrary deep
+        # trees can't hit the recursion limit
+        stack = [str(path)]
+        while stack:
+            current = stack.pop()
+            # the dir could be removed while we walk, or be unreadable,
+            # just skip it then, same as du would complain and go on
+            try:
+                with os.scandir(current) as it:
+                    for entry in it:
+                        try:
+                            # don't follow symlinks to not count the same
+                            # data twice or escape the tree
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append(entry.path)
+                            else:
+                                total += entry.stat(follow_symlinks=False).st_size
+                        except OSError:
+                            pass
+            except OSError:
+                pass
+        return total
+
+    @staticmethod
+    def _dir_size_iouring(path: Path) -> int:
+        """Same job as _dir_size but the stat part goes through
+        io_uring. Directories are still enumerated with os.scandir
+        because getdents has no uring equivalent, file sizes are
+        requested with batched IORING_OP_STATX submissions instead
+        of one blocking syscall per file.
+
+        Args:
+            path (Path): the directory to measure
+
+        Returns:
+            int: summary size of all files in the tree in bytes
+        """
+        # the same root guard as in _dir_size - a symlinked or other
+        # non-directory root counts as itself only
+        try:
+            root_stat = os.lstat(path)
+        except OSError:
+            return 0
+        if not stat.S_ISDIR(root_stat.st_mode):
+            return root_stat.st_size
+        # first gather all file paths, recursing dirs the same
+        # way _dir_size does
+        files = []
+        stack = [str(path)]
+        while stack:
+            current = stack.pop()
+            try:
+                with os.scandir(current) as it:
+                    for entry in it:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append(entry.path)
+                            else:
+                                files.append(entry.path)
+                        except OSError:
+                            pass
+            except OSError:
+                pass
+        total = 0
+        ring = liburing.io_uring()
+        liburing.io_uring_queue_init(IO_URING_QUEUE_DEPTH, ring, 0)
+        try:
+            cqe = liburing.io_uring_cqe()
+            # submit in batches no bigger than the queue depth,
+            # then drain completions summing the sizes up
+            for start in range(0, len(files), IO_URING_QUEUE_DEPTH):
+                batch = files[start:start + IO_URING_QUEUE_DEPTH]
+                stx = liburing.statx(len(batch))
+                for i, file in enumerate(batch):
+                    sqe = liburing.io_uring_get_sqe(ring)
+                    # fsencode, not encode - names with non-UTF-8 bytes
+                    # come from scandir as surrogates and strict encoding
+                    # would blow up on them
+                    liburing.io_uring_prep_statx(
+                        sqe, -1, os.fsencode(file), liburing.AT_SYMLINK_NOFOLLOW,
+                        liburing.STATX_SIZE, stx[i]
+                    )
+                    # completions come back in any order - tag each
+                    # submission with its buffer index so the result
+                    # is matched to the right file
+                    liburing.io_uring_sqe_set_data64(sqe, i)
+                liburing.io_uring_submit(ring)
+                for _ in range(len(batch)):
+                    liburing.io_uring_wait_cqe(ring, cqe)
+                    # negative res means the file vanished or can't be
+                    # stated, skip it like the plain walker does
+                    if cqe.res >= 0:
+                        total += stx[cqe.user_data].stx_size
+                    liburing.io_uring_cqe_seen(ring, cqe)
+        finally:
+            liburing.io_uring_queue_exit(ring)
+        return total
+
+    @staticmethod
+    def _dir_newest_mtime(path: Path) -> int:
+        """Finds the mtime of the newest file in a directory tree.
+        Same scandir walk as _dir_size, instead of spawning find and
+        sorting its whole text output just to look at the first line,
+        only the running maximum is kept.
+
+        Args:
+            path (Path): the directory to look in
+
+        Returns:
+            int: mtime of the newest file as an integer timestamp,
+                        0 if the tree contains no files
+        """
+        # prefer the compiled walker when it was built
+        if _walk is not None:
+            return _walk.dir_newest_mtime(str(path))
+        best = 0.0
+        stack = [str(path)]
+        while stack:
+            current = stack.pop()
+            # same as in _dir_size - skip whatever disappeared
+            # or can't be read
+            try:
+                with os.scandir(current) as it:
+                    for entry in it:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append(entry.path)
+                            elif entry.is_file(follow_symlinks=False):
+                                best = max(best, entry.stat(follow_symlinks=False).st_mtime)
+                        except OSError:
+                            pass
+            except OSError:
+                pass
+        return int(best)
+
     @staticmethod
     def _add_stat_properties(
-        filepaths: list[Path],
+        filepaths: Iterable[Path],
         stattype: str = 'size',
         sort: bool = True,
-        sort_reversed: bool = True
-    ) -> list[tuple[str, int]]:
+        sort_reversed: bool = True,
+        size_cache: dict[str, int]|None = None
+    ) -> tuple[list[str], array]:
         """Retrieves string representation of provided Paths and
         their desirable stat value. Directories are a special case
         because their metadata doesn't have st_size value of
-        their content, thus it has to be calculated separatelly.
-        Using du in this case. Sorts content by default because
-        it will be needed anyway.
+        their content, thus it has to be calculated separatelly
+        by walking their trees. Sorts content by default because
+        it will be needed anyway. The result is two parallel
+        sequences - paths and their values - instead of a list of
+        tuples, so the values live in a compact typed array with no
+        tuple object per entry.
 
         Args:
-            filepaths (list[Path]): the list of Path objects, containing
-                        files/dirs we want to get stat for
+            filepaths (Iterable[Path]): Path objects of the files/dirs
+                        we want to get stat for, any iterable goes
             stattype (str): stat name. Only two values are supported - size and age.
                         Defaults to size. Any other value will be interpreted as age
             sort (bool, optional): if output items should be sorted. Defaults to True.
             sort_reversed (bool, optional): reversed sort order. Defaults to True.
+            size_cache (dict[str, int]|None, optional): already known directory
+                        sizes keyed by path string. Hit values are reused without
+                        a walk and freshly computed ones get stored back.
+                        Defaults to None which means no caching
 
         Returns:
-            list[tuple[str, int]]: string representation of Path and
-                        the desired stat value in smallest dimention unit
+            tuple[list[str], array]: parallel sequences of string
+                        representations of Paths and the desired stat values
+                        in smallest dimention unit
         """
-        # for gathering the result
-        result = []
+        # for gathering the result - parallel columns instead of tuples.
+        # Sizes are whole bytes, file mtimes carry a fraction, hence
+        # different typecodes
+        paths: list[str] = []
+        values = array('q' if stattype == 'size' else 'd')
         # set proper stat names for files:
         stat_name_file = 'st_size' if stattype == 'size' else 'st_mtime'
         # loop over all done file Paths
         for filepath in filepaths:
-            # try to append a tuple with string representation of file Path object
-            # and the value of desirable stat
+            # try to append string representation of file Path object
+            # and the value of desirable stat to the columns
             try:
                 if filepath.is_file():
-                    result.append((str(filepath), getattr(filepath.stat(), stat_name_file)))
+                    paths.append(str(filepath))
+                    values.append(getattr(filepath.stat(), stat_name_file))
                 # different behaviour should be applied for size and age requested properties
                 else:
                     if stattype == 'size':
-                        # get directory content size in bytes. Turn the result into integer,
-                        # because a string gets recieved
-                        result.append((str(filepath), int(check_output(['du','-shb', filepath]).split()[0].decode('utf-8'))))
+                        # if this dir was already measured during this run,
+                        # don't walk it again
+                        if size_cache is not None and (size := size_cache.get(str(filepath))) is not None:
+                            paths.append(str(filepath))
+                            values.append(size)
+                            continue
+                        # many dirs to measure are freshly cleaned caches and
+                        # sit empty - one scandir peek spots that and skips
+                        # setting a whole walk up for an obvious zero.
+                        # Anything scandir chokes on - unreadable dirs,
+                        # fifos, looping symlinks - is left to the walker,
+                        # which tolerates such paths the same way du would
+                        try:
+                            with os.scandir(filepath) as it:
+                                if next(it, None) is None:
+                                    if size_cache is not None:
+                                        size_cache[str(filepath)] = 0
+                                    paths.append(str(filepath))
+                                    values.append(0)
+                                    continue
+                        except OSError:
+                            pass
+                        # get directory content size in bytes with the in-process
+                        # walker, no du subprocess needed. Prefer the io_uring
+                        # backend when the bindings are there and not disabled
+                        if liburing is not None and not os.environ.get(DISABLE_IO_URING_ENV):
+                            try:
+                                size = ScannerAndCleaner._dir_size_iouring(filepath)
+                            # old kernels may lack statx support in uring,
+                            # then just walk the plain way
+                            except OSError:
+                                size = ScannerAndCleaner._dir_size(filepath)
+                        else:
+                            size = ScannerAndCleaner._dir_size(filepath)
+                        if size_cache is not None:
+                            size_cache[str(filepath)] = size
+                        paths.append(str(filepath))
+                        values.append(size)
                     else:
-                        # get directory newest file and it's mtime as timestamp. Turn the result
-                        # into integer because a string get's recieved
-                        # intermadiate result of all files in the dir. Looks like
-                        # 1673056643.0591811510+ ./hddmount.sh\n1668203225.0092705030+ ./accel.sh\n
-                        # thus after split there will be one empty string, which has to be removed
-                        all_dir_files = check_output(['find', filepath, '-type', 'f', '-printf', '%T@+ %p\n']).decode('utf-8').split('\n')
-                        # if dir isn't empty, all_dir_files should have at least two items
-                        if len(all_dir_files) > 1:
-                            # get biggest on top
-                            all_dir_files.sort(reverse=True)
-                            # skip the empty element and append result with integer value of the timestamp
-                            # like 1677526944.8052486550+
-                            result.append((str(filepath), int(all_dir_files[1].split('.')[0])))
+                        # get the mtime of the newest file in the dir with the
+                        # in-process walker, no find subprocess and no sorting
+                        # of its whole output needed
+                        newest = ScannerAndCleaner._dir_newest_mtime(filepath)
+                        # zero means the tree has no files at all, same as find
+                        # giving no output - such dir shouldn't appear in the result
+                        if newest:
+                            paths.append(str(filepath))
+                            values.append(newest)
             # if such file doesn't exist, which can easily happen, because it could
-            # be removed between scanning and analizying, just skip it. Also skip
-            # if any issues were met by du
-            except (FileNotFoundError, CalledProcessError):
+            # be removed between scanning and analizying, just skip it
+            except FileNotFoundError:
                 pass
         if sort:
-            # sort from biggest to smallest by the second value of tuple (path, property)
-            result.sort(key=lambda elem_tuple: elem_tuple[1], reverse=sort_reversed)
-        return result
+            # sort both columns together by value, biggest first by default
+            order = sorted(range(len(values)), key=values.__getitem__, reverse=sort_reversed)
+            paths = [ paths[i] for i in order ]
+            values = array(values.typecode, (values[i] for i in order))
+        return paths, values
     
     @staticmethod
     def _erase_subs(filelist: list) -> None:
-        """Calls the system program rm to remove items from the path dir,
-        or a file. 
+        """Removes the given files and directories in-process. One rm
+        subprocess per path was an enormous fork+exec tax and the
+        removals were left running in the background, so the post-clean
+        size measurement raced with them. Deletions now happen in a
+        thread pool and are guaranteed to be finished on return.
 
         Args:
-            filelist (list): list of paths to delete files from
+            filelist (list): list of paths to delete
         """
-        for file in filelist:
-            Popen(['rm', '-rf', file])
+        def remove_one(path) -> None:
+            path = Path(path)
+            # a symlink to a dir must be unlinked, not descended into
+            if path.is_dir() and not path.is_symlink():
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                # the path could vanish on its own, same as rm -f
+                # we don't care then
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            # consume the iterator so all removals complete before return
+            list(executor.map(remove_one, filelist))
 
     @staticmethod
     def _bytes_to_mib(value: int) -> str:
@@ -221,6 +526,20 @@ class ScannerAndCleaner:
         """
         return f'{(value / 1048576):.3f} MiB'
     
+    def _invalidate_size_cache(self, path: Path) -> None:
+        """Drops cached sizes which the cleaning of a path made stale -
+        the path itself, everything under it and every its ancestor
+
+        Args:
+            path (Path): the path that just got cleaned
+        """
+        cleaned = str(path)
+        for key in list(self._size_cache):
+            # key is under the cleaned path or the cleaned path is under key
+            if (key.startswith(cleaned.rstrip('/') + '/') or cleaned.startswith(key.rstrip('/') + '/')
+                    or key.rstrip('/') == cleaned.rstrip('/')):
+                del self._size_cache[key]
+
     def _make_datafiles_path(self) -> None:
         """Creates directories chain if it doesn't exist
         """
@@ -232,8 +551,89 @@ class ScannerAndCleaner:
         Args:
             filepath (TextIO): a Path file path object to write in
         """
-        # set is not serializable, we have list for this
-        filepath.write_text(json.dumps(self.watchdirs_content_list))
+        # set is not serializable, sort it into a list right here -
+        # sorted output also keeps the file diffable between runs
+        filepath.write_text(json.dumps({ k: sorted(v) for k, v in self.watchdirs_content_set.items() }))
+
+    def _read_fresh_journal(self) -> set[str]|None:
+        """Reads paths the inotify daemon recorded since the last scan.
+        The journal is only trusted when the daemon has been watching
+        since before the stored scan result was written (its start
+        stamp proves that) and wrote to the journal after it - anything
+        else can't rule out unobserved changes, so the full enumeration
+        diff has to be used
+
+        Returns:
+            set[str]|None: recorded paths, or None when the journal
+                        can't be used
+        """
+        if INotify is None or not self.inotify_journal.exists():
+            return None
+        stored_mtime = self.watchdirs_file.stat().st_mtime
+        # no writes since the stored result - can't prove the daemon
+        # is still alive
+        if self.inotify_journal.stat().st_mtime < stored_mtime:
+            return None
+        journal_lines = self.inotify_journal.read_text().splitlines()
+        # the daemon stamps the journal with its start time. No stamp
+        # means no daemon wrote this journal
+        if not journal_lines or not journal_lines[0].startswith('!start '):
+            return None
+        try:
+            started = float(journal_lines[0].removeprefix('!start '))
+        except ValueError:
+            return None
+        # a daemon started after the stored result was written has not
+        # observed the interval in between - whatever appeared while no
+        # daemon ran would be missed forever if this journal was trusted
+        if started > stored_mtime:
+            return None
+        # one path per line, skip possible empty trailing line. An
+        # overflow stamp means the daemon lost events, such a journal
+        # is incomplete and can't be trusted
+        journal_paths = set()
+        for line in journal_lines[1:]:
+            if line.startswith('!'):
+                return None
+            if line:
+                journal_paths.add(line)
+        return journal_paths
+
+    def watch_daemon(self) -> None:
+        """Blocks forever, recording every entry created in or moved
+        into the watched dirs to the journal file, which scan later
+        diffs against the stored result instead of re-enumerating
+        everything. Requires the optional inotify_simple module
+        """
+        if INotify is None:
+            raise RuntimeError('inotify_simple is not installed, daemon mode is unavailable')
+        self._make_datafiles_path()
+        # a freshly started daemon invalidates whatever a previous one
+        # left in the journal and stamps when its own observation began,
+        # so scan won't trust it for the interval nobody was watching
+        self.inotify_journal.write_text(f'!start {time.time()}\n')
+        inotify = INotify()
+        # to restore the full path from an event, which carries only
+        # the entry name and the watch descriptor
+        watch_to_dir = {}
+        for directory in self.watch_dirs:
+            # a watched dir could not exist on this machine
+            try:
+                wd = inotify.add_watch(directory, inotify_flags.CREATE | inotify_flags.MOVED_TO)
+                watch_to_dir[wd] = directory
+            except OSError:
+                pass
+        with self.inotify_journal.open('a') as journal:
+            while True:
+                for event in inotify.read():
+                    # wd -1 means the kernel queue overflowed and events
+                    # got lost - the journal is incomplete from now on,
+                    # stamp it so scan falls back to the full diff
+                    if event.wd not in watch_to_dir:
+                        journal.write('!overflow\n')
+                        continue
+                    journal.write(f'{watch_to_dir[event.wd] / event.name}\n')
+                journal.flush()
 
     def report(self) -> None:
         """Shows the report on the screen via notify-send
@@ -242,33 +642,46 @@ class ScannerAndCleaner:
         icon = '/usr/share/icons/breeze-dark/applets/256/org.kde.plasma.folder.svg'
         Popen(['notify-send', '-i', icon, '-t', '0', 'Crapremoval report', self.notify_report])        
 
-    def scan(self) -> None:
-        """Looks for watchdirs.json, creates it if doesn't find,
-        compares it's contents with the current watched dirs
-        contents. Overwrites watchdirs.json with new changes,
-        creates report with the information about new directories
-        and top n boggest directories/files.
+    def _scan_diff(self) -> str:
+        """The diff half of scan - compares the stored watchdirs.json
+        with the current watched dirs contents and rewrites the file
+
+        Returns:
+            str: the scan part of the report
         """
-        # make data files dir if it doesn't exist
-        self._make_datafiles_path()
         # if file exists we can analyze it
         if self.watchdirs_file.exists():
             # if it's not a valid json, that the file is corrupted
             # no point to analyze it. Just make a new one and return
             try:
-                watchdirs_file_content = json.loads(self.watchdirs_file.read_text())
+                # turn the stored lists into sets once, so each diff below
+                # doesn't build a transient set from a list again
+                stored_content = { k: set(v) for k, v in json.loads(self.watchdirs_file.read_text()).items() }
                 new_content = {}
-                # only new files and directories in the watched dirs are recorded
-                # removal isn't tracked
-                for key in self.watchdirs_content_set:
-                    # new directories to watch could be added during the script
-                    # expluataion, they won't be in the stored file, so KeyError
-                    # will be rised
-                    try:
-                        if (current_content := self.watchdirs_content_set[key].difference(watchdirs_file_content[key])):
-                            new_content[key] = list(current_content)
-                    except KeyError:
-                        new_content[key] = f'Seems like a new directory, it was not found in a stored file'
+                # if the inotify daemon recorded events since the last scan,
+                # its journal already names everything new - diff just the
+                # journal against the stored sets
+                if (journal_paths := self._read_fresh_journal()) is not None:
+                    for path in journal_paths:
+                        key = str(Path(path).parent)
+                        if key in stored_content and path not in stored_content[key]:
+                            new_content.setdefault(key, []).append(path)
+                    # dirs added to watching since the stored file was
+                    # written still have to be flagged
+                    for key in self.watchdirs_content_set:
+                        if key not in stored_content:
+                            new_content[key] = f'Seems like a new directory, it was not found in a stored file'
+                # otherwise fall back to the full enumeration diff.
+                # Only new files and directories in the watched dirs are
+                # recorded, removal isn't tracked
+                else:
+                    for key, current in self.watchdirs_content_set.items():
+                        # new directories to watch could be added during the script
+                        # expluataion, they won't be in the stored file
+                        if key not in stored_content:
+                            new_content[key] = f'Seems like a new directory, it was not found in a stored file'
+                        elif (difference := current - stored_content[key]):
+                            new_content[key] = list(difference)
                 # rewrite watchdirs because some directories could be removed from watching
                 self._write_watchdirs(self.watchdirs_file)
                 # prepare the output
@@ -286,31 +699,71 @@ class ScannerAndCleaner:
             self._write_watchdirs(self.watchdirs_file)
             report_scan = ('The result of previous scan was not found, new result created,\n'
                            'but no scan results can be presented')
-        # now prepare a list of largest files/directories
-        # all_content for the list of all paths with their appropriate sizes
-        all_content = []
-        # get the sizes in sorted order from biggest to smallest (default)
-        for paths in self.watchdirs_content_Path.values():
-            all_content += self._add_stat_properties(paths)
-        # prepare string with biggest, considering that it can be less than TOP_SIZES
-        # make readable strings from tuples and convert byte sizes into human readable
-        # count top n records
-        top_size_things = ''
-        counter = self.ntopfiles
-        while counter > 0:
-            try:
-                one_row = all_content.pop(0)
-                # 1048576 = 1024**2 i.e. MiB, round to 3 digits after dot
-                top_size_things += f'{one_row[0]} SIZE {self._bytes_to_mib(one_row[1])}\n'
-                counter -= 1
-            # stop earlier if the list of records is empty
-            except IndexError:
-                break
-        # write the report. Separator, today date, scan results and top n biggest files/dirs
-        with self.report_file.open('a') as f:
+        return report_scan
+
+    def _scan_top_sizes(self) -> str:
+        """The size half of scan - measures everything in the watched
+        dirs and picks the top n biggest entries
+
+        Returns:
+            str: the top sizes part of the report, one line per entry
+        """
+        # prepare a list of largest files/directories - two merged
+        # columns for all paths and their appropriate sizes
+        all_paths = []
+        all_sizes = array('q')
+        # walking directory trees is I/O bound, so independent subtrees
+        # can be measured in parallel instead of one after another.
+        # Flatten children of all watched dirs into one pool and collect
+        # results as they complete, order doesn't matter before the sort.
+        # Path objects are made right here from the string sets, one at
+        # a time - no point keeping a third parallel collection around
+        with ThreadPoolExecutor(max_workers=self._stat_walk_workers()) as executor:
+            futures = [
+                executor.submit(self._add_stat_properties, [Path(child)], 'size', False, size_cache=self._size_cache)
+                for names in self.watchdirs_content_set.values() for child in names
+            ]
+            for future in as_completed(futures):
+                paths, sizes = future.result()
+                all_paths += paths
+                all_sizes += sizes
+        # only the top n records are reported, so there is no need to
+        # sort the whole list - a bounded heap selection over indexes
+        # is enough and builds no (path, size) tuple per entry.
+        # nlargest also handles the list being shorter than n
+        top_indexes = heapq.nlargest(self.ntopfiles, range(len(all_sizes)), key=all_sizes.__getitem__)
+        # make readable strings from the columns and convert byte sizes
+        # into human readable. One join instead of growing the string
+        # line by line, the MiB conversion is inlined to skip a method
+        # call per row. 1048576 = 1024**2 i.e. MiB, 3 digits after dot
+        return ''.join(
+            f'{all_paths[i]} SIZE {all_sizes[i] / 1048576:.3f} MiB\n'
+            for i in top_indexes
+        )
+
+    async def scan(self) -> None:
+        """Looks for watchdirs.json, creates it if doesn't find,
+        compares it's contents with the current watched dirs
+        contents. Overwrites watchdirs.json with new changes,
+        creates report with the information about new directories
+        and top n boggest directories/files. The diff and the size
+        gathering don't depend on each other, so both blocking chores
+        run overlapped in the event loop's executor.
+        """
+        # make data files dir if it doesn't exist
+        self._make_datafiles_path()
+        loop = asyncio.get_running_loop()
+        report_scan, top_size_things = await asyncio.gather(
+            loop.run_in_executor(None, self._scan_diff),
+            loop.run_in_executor(None, self._scan_top_sizes)
+        )
+        # write the report. Separator, today date, scan results and top n
+        # biggest files/dirs. Paths with non-UTF-8 bytes carry surrogates
+        # which a strict text write refuses - escape them instead of dying
+        with self.report_file.open('a', errors='backslashreplace') as f:
             f.write(
                 '======================== scan ========================\n'
-                f'{str(datetime.now().strftime("%Y-%m-%d, %H:%M:%S"))}\n\n{report_scan}\n\n'
+                f'{datetime.now().strftime("%Y-%m-%d, %H:%M:%S")}\n\n{report_scan}\n\n'
                 f'Top {self.ntopfiles} biggest files/directories:\n'
                 f'{top_size_things}'
             )
@@ -318,22 +771,23 @@ class ScannerAndCleaner:
         # works with htm tags
         self.notify_report += report_scan + f'\n<a href="file:///{str(self.report_file)}">View report</a>\n'
 
-    def _count_erased_size(self, saved_sizes: list[tuple[str, int]]) -> dict[str, str|int]:
+    def _count_erased_size(self, saved_sizes: tuple[list[str], array]) -> dict[str, str|int]:
         """Creates an intermediate data for cleaner's report
 
         Args:
-            saved_sizes (list[tuple[str, int]]): a list of tuples, containing file path and
-                        size, sevad before the cleaning had begun
+            saved_sizes (tuple[list[str], array]): parallel columns of file
+                        paths and sizes, saved before the cleaning had begun
 
         Returns:
             dict[str, str|int]: the result for size difference for each saved_sizes item
                         and total size of cleaned data
         """
-        # request new size data
-        new_sizes = dict(self._add_stat_properties([ x.path for x in self.dirstoclean ], sort=False))
+        # request new size data. Cleaned paths were dropped from the cache,
+        # so only those get re-measured, the untouched ones come cached
+        new_sizes = dict(zip(*self._add_stat_properties([ x.path for x in self.dirstoclean ], sort=False, size_cache=self._size_cache)))
         result = [] # detailed result
         total_result = 0 # total size of cleaned data
-        for k, v in saved_sizes:
+        for k, v in zip(*saved_sizes):
             # get the difference between new and old sizes
             if (item := new_sizes.get(k)) is not None:
                 size_diff = item - v
@@ -362,62 +816,82 @@ class ScannerAndCleaner:
         # prepare file for a new count
         with self.timer_file.open('w') as f:
             f.write(str(clean_each_x_launch))
-        # save size data for future report
-        item_sizes = self._add_stat_properties([ x.path for x in self.dirstoclean ], sort=False)
+        # save size data for future report. Sizes already measured by scan
+        # in this run are taken from the cache instead of a second walk
+        item_sizes = self._add_stat_properties([ x.path for x in self.dirstoclean ], sort=False, size_cache=self._size_cache)
+        # one timestamp for all remove_older checks - no point
+        # constructing a datetime per item for the same moment
+        now_ts = time.time()
         # loop over all provided for cleaning paths
         for item in self.dirstoclean:
             # === first filter - content type dirs and files or only files ===
-            if item.type_to_del == 'f': # if only files are requested to delete
-                all_files_in_dir = item.path.glob('*') # get all dir content
-                # filter out only files
+            # os.scandir answers is_file from the directory entry itself
+            # on most filesystems, so unlike glob + Path.is_file no extra
+            # stat per entry is paid for the files-only filter
+            try:
+                with os.scandir(item.path) as it:
+                    files_to_remove = [
+                        Path(entry.path) for entry in it
+                        # everything for removal unless only files are requested
+                        if item.type_to_del != 'f' or entry.is_file()
+                    ]
+            # the dir to clean may not exist on this machine
+            except OSError:
                 files_to_remove = []
-                for file in all_files_in_dir:
-                    if file.is_file():
-                        files_to_remove.append(file)
-            else: # everything for removal
-                files_to_remove = list(item.path.glob('*'))
             # === second filter - n files to keep, most recent are left ===
             # === or files that are younger than x days are kept. or none ===
             if item.num_to_keep > 0: # check for n files to keep
-                files_to_remove = self._add_stat_properties(files_to_remove, 'age') # get age data
+                age_paths, _ = self._add_stat_properties(files_to_remove, 'age') # get age data
                 # exclude top n files or dirs if there is more stuff than needed
-                if len(files_to_remove) > item.num_to_keep:
-                    files_to_remove = files_to_remove[item.num_to_keep:]
+                if len(age_paths) > item.num_to_keep:
+                    files_to_remove = age_paths[item.num_to_keep:]
                 else:
                     files_to_remove = []
             else: # check for files, younger than x days
                 if item.remove_older is not None:
-                    files_to_remove = self._add_stat_properties(files_to_remove, 'age') # get age data
+                    age_paths, age_mtimes = self._add_stat_properties(files_to_remove, 'age') # get age data
                     # file should be older than this val to get removed
-                    trashold = datetime.timestamp(datetime.now()) - item.remove_older * 86400
-                    counter = 0 # count how many items to keep
-                    for _, v in files_to_remove:
-                        # files are sorted. If file older than we requested
-                        # is found, stop counting
-                        if v < trashold:
-                            break
-                        counter += 1
-                    files_to_remove = files_to_remove[counter:] # leave only old files
+                    trashold = now_ts - item.remove_older * 86400
+                    # files are sorted by mtime descending, so the first one
+                    # older than the trashold is found with a binary search
+                    # over the negated mtime column instead of a linear walk
+                    keep_count = bisect.bisect_right(age_mtimes, -trashold, key=lambda mtime: -mtime)
+                    files_to_remove = age_paths[keep_count:] # leave only old files
             # === third filter - exclude ignored files ===
+            # the second filter already leaves bare path strings,
+            # the age column stays behind in _add_stat_properties result
             final_files_to_remove = [] # for new list, with ignored files excluded
-            # age data isn't needed anymore, so if the second filter
-            # was applied, disband tuples
-            if item.num_to_keep > 0 or item.remove_older is not None:
-                files_to_remove = dict(files_to_remove).keys()
-            for file in files_to_remove:
-                # if file has no ignored substrings in it's path, add it for future removal
-                if not any(substring in file for substring in item.ignore):
-                    final_files_to_remove.append(file)
+            # with several ignore patterns one automaton pass per path
+            # replaces a substring scan per pattern. For zero or one
+            # pattern the plain check is already optimal
+            if ahocorasick is not None and len(item.ignore) > 1:
+                automaton = ahocorasick.Automaton()
+                for substring in item.ignore:
+                    automaton.add_word(substring, substring)
+                automaton.make_automaton()
+                for file in files_to_remove:
+                    # if file has no ignored substrings in it's path, add it for future removal
+                    if next(automaton.iter(str(file)), None) is None:
+                        final_files_to_remove.append(file)
+            else:
+                for file in files_to_remove:
+                    # if file has no ignored substrings in it's path, add it for future removal
+                    if not any(substring in str(file) for substring in item.ignore):
+                        final_files_to_remove.append(file)
             self._erase_subs(final_files_to_remove) # remove files
+            # the removal made cached sizes around this path stale
+            if final_files_to_remove:
+                self._invalidate_size_cache(item.path)
         # prepare the report
         report = self._count_erased_size(item_sizes)
-        report_size_str = ''
-        for k, v in report['all_positions']:
-            if v == '-':
-                report_size_str += f'{k} SIZE -\n'
-            else:
-                report_size_str += f'{k} SIZE {self._bytes_to_mib(v)}\n'
-        with self.report_file.open('a') as f:
+        # one join instead of growing the string line by line, with the
+        # MiB conversion inlined and '-' kept for vanished paths
+        report_size_str = ''.join(
+            f'{k} SIZE -\n' if v == '-' else f'{k} SIZE {v / 1048576:.3f} MiB\n'
+            for k, v in report['all_positions']
+        )
+        # escape possible surrogates in paths, same as the scan report
+        with self.report_file.open('a', errors='backslashreplace') as f:
             f.write(
                 '======================== clean =======================\n'
                 'Cleaning results for each position:\n'
@@ -430,6 +904,13 @@ class ScannerAndCleaner:
 
 if __name__ == '__main__':
     sc = ScannerAndCleaner(DATA_FILES_PATH, WATCH_DIRS, TOP_SIZES, CLEAN_DIRS)
-    sc.scan()
-    sc.cleaner(14)
-    sc.report()
+    # daemon mode doesn't scan or clean, it just keeps recording
+    # new entries in the watched dirs until killed
+    if '--daemon' in sys.argv:
+        sc.watch_daemon()
+    else:
+        # scan overlaps its own phases inside, cleaner stays after it
+        # because its deletions would race with the size gathering
+        asyncio.run(sc.scan())
+        sc.cleaner(14)
+        sc.report()
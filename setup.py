@@ -0,0 +1,13 @@
+#!/usr/bin/python
+
+# Builds the optional compiled walkers from _walk.pyx:
+#   python setup.py build_ext --inplace
+# The script works fine without them, just slower on big trees
+
+from setuptools import setup
+from Cython.Build import cythonize
+
+setup(
+    name='crapremoval_walk',
+    ext_modules=cythonize('_walk.pyx'),
+)